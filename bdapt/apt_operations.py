@@ -1,18 +1,85 @@
 """APT command execution and parsing utilities."""
 
+import fcntl
+import hashlib
+import os
 import re
+import shutil
 import subprocess
-from contextlib import nullcontext
-from typing import Any, List, Optional
+import sys
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import (Any, Callable, Dict, FrozenSet, Iterable, Iterator, List,
+                    NoReturn, Optional, Tuple)
 
 from . import console as console_module
 from .console import console
 from .exceptions import CommandError
 
+APT_ARCHIVES_DIR = "/var/cache/apt/archives"
+APT_ARCHIVES_LOCK = f"{APT_ARCHIVES_DIR}/lock"
+APT_PARTIAL_DIR = f"{APT_ARCHIVES_DIR}/partial"
+DPKG_STATUS_FILE = "/var/lib/dpkg/status"
+
+# 'URI' filename size hash, as printed by `apt-get --print-uris`
+_PRINT_URIS_RE = re.compile(r"^'(\S+)' (\S+) \d+ (\w+):([0-9a-f]+)$")
+
+# Hashes of --print-uris, as hashlib and aria2c name them
+_PRINT_URIS_HASHES = {
+    "SHA512": ("sha512", "sha-512"),
+    "SHA256": ("sha256", "sha-256"),
+    "SHA1": ("sha1", "sha-1"),
+    "MD5Sum": ("md5", "md5"),
+}
+
+# Package counts of APT's change summary
+_SUMMARY_COUNTS_RE = re.compile(r"^(\d+) upgraded, (\d+) newly installed", re.M)
+
+# Final line of APT's change summary, e.g. "1 upgraded, ... not upgraded."
+_SUMMARY_END_RE = re.compile(r"\d+.*not upgraded\.$")
+
+# Summary of a transaction that would not touch any package
+_NO_CHANGES_RE = re.compile(
+    r"^0 upgraded, 0 newly installed, 0 to remove\b", re.M)
+
+# Options for apt runs whose output is parsed rather than shown: no pty,
+# colours, translations or progress bars. "-q" is as far as it goes, since
+# "-q=2" also drops the change summary.
+_APT_PARSE_OPTS = [
+    "-o", "Dpkg::Use-Pty=0",
+    "-o", "APT::Color=0",
+    "-o", "Acquire::Languages=none",
+    "-q",
+]
+
+# Untranslated messages are cheaper to produce and what the parser expects
+_APT_PARSE_ENV = {**os.environ, "LC_ALL": "C"}
+
+# Per-package lines of a simulated run; the bulk of a large dry-run output
+_SIMULATION_PREFIXES = (b"Inst ", b"Conf ", b"Remv ", b"Purg ")
+_SIMULATION_LINE_PATTERN = "^(Inst|Conf|Remv|Purg) "
+
+
+def _sudo_prefix() -> List[str]:
+    """Prefix for commands that need root; empty when already root."""
+    return [] if os.geteuid() == 0 else ["sudo"]
+
+
+@lru_cache(maxsize=None)
+def _which(command: str) -> bool:
+    """Look up a command on PATH once per process."""
+    return shutil.which(command) is not None
+
 
 class AptCommandRunner:
     """Handles execution of APT commands."""
 
+    def __init__(self):
+        """Initialize the APT command runner."""
+        # Dry-run summaries keyed by package set and dpkg status mtime
+        self._dry_run_cache: Dict[Tuple[Tuple[str, ...], int], Optional[str]] = {}
+
     def check_command_exists(self, command: str) -> bool:
         """Check if a command exists on the system.
 
@@ -22,16 +89,7 @@ class AptCommandRunner:
         Returns:
             True if command exists, False otherwise
         """
-        try:
-            subprocess.run(
-                ["which", command],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return _which(command)
 
     def parse_apt_output(self, output: str) -> Optional[str]:
         """Parse APT output and extract the package change summary.
@@ -40,25 +98,29 @@ class AptCommandRunner:
             output: Raw APT command output
 
         Returns:
-            Formatted summary of package changes, or None if no changes found
+            Formatted summary of package changes, an empty string if APT
+            reports that nothing would change, or None if no summary is found
         """
-        lines = output.strip().split('\n')
+        if _NO_CHANGES_RE.search(output):
+            return ""
+
         summary_lines = []
         in_summary = False
 
-        for line in lines:
+        for line in output.strip().splitlines():
             # Look for the start of package change summary
             if line.startswith('The following'):
                 in_summary = True
                 summary_lines.append(line)
             elif in_summary:
+                stripped = line.strip()
                 # Continue collecting lines until we hit the upgrade/install summary
-                if re.match(r'^\d+.*not upgraded\.$', line.strip()):
+                if _SUMMARY_END_RE.match(stripped):
                     summary_lines.append(line)
                     break
-                elif line.strip() and not line.startswith(' '):
+                elif stripped and not line.startswith(' '):
                     # If we hit a non-indented line that's not the summary end, we might be done
-                    if not re.match(r'^\d+', line.strip()):
+                    if not stripped[0].isdigit():
                         break
                 summary_lines.append(line)
 
@@ -72,56 +134,165 @@ class AptCommandRunner:
         check: bool = True,
         **kwargs: Any
     ) -> subprocess.CompletedProcess:
+        """Run a command to completion.
+
+        Every subprocess bdapt spawns goes through this method or
+        :meth:`stream_command`, so there is a single place that maps a
+        missing executable to a CommandError.
+
+        Args:
+            cmd: Command to execute
+            check: Raise CalledProcessError on a non-zero exit status
+            **kwargs: Passed through to subprocess.run
+
+        Returns:
+            The completed process
+
+        Raises:
+            CommandError: If the command is not found
+        """
         try:
             result = subprocess.run(cmd, check=check, **kwargs)
             return result
         except FileNotFoundError:
             raise CommandError(f"Command not found: {cmd[0]}")
 
-    def run_apt_dry_run(self, packages: List[str]) -> Optional[str]:
+    def stream_command(
+        self,
+        cmd: List[str],
+        text: bool = True,
+        filter_cmd: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> Iterator[Any]:
+        """Run a command and yield its stdout line by line as it is produced.
+
+        Args:
+            cmd: Command to execute
+            text: Decode stdout to str; pass False to get raw bytes lines
+            filter_cmd: Optional filter (e.g. grep) to pipe stdout through
+                before it reaches Python; its own exit status is ignored
+
+        Yields:
+            Lines of standard output, including line endings
+
+        Raises:
+            CommandError: If the command is not found
+            subprocess.CalledProcessError: If the command exits non-zero,
+                carrying the captured stderr
+        """
+        # stderr goes to a file so a chatty child can never block on a full
+        # pipe while we are still reading stdout
+        with tempfile.TemporaryFile("w+") as stderr_file:
+            try:
+                proc = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr_file,
+                    text=text and filter_cmd is None,
+                    **kwargs
+                )
+            except FileNotFoundError:
+                raise CommandError(f"Command not found: {cmd[0]}")
+
+            with proc:
+                assert proc.stdout is not None
+                if filter_cmd is None:
+                    yield from proc.stdout
+                else:
+                    with subprocess.Popen(
+                        filter_cmd,
+                        stdin=proc.stdout,
+                        stdout=subprocess.PIPE,
+                        text=text
+                    ) as filter_proc:
+                        # Only the filter holds the read end now, so the
+                        # command sees SIGPIPE should the filter go away
+                        proc.stdout.close()
+                        assert filter_proc.stdout is not None
+                        yield from filter_proc.stdout
+
+            if proc.returncode:
+                stderr_file.seek(0)
+                raise subprocess.CalledProcessError(
+                    proc.returncode, cmd, stderr=stderr_file.read())
+
+    def run_apt_dry_run(
+        self,
+        packages: List[str],
+        on_progress: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
         """Run APT dry-run and return package change summary.
 
         Args:
             packages: List of package names
+            on_progress: Called with each kept output line as apt prints it,
+                so progress can be shown while the solver runs
 
         Returns:
-            Package change summary or None if no changes
+            Package change summary, an empty string if nothing would
+            change, or None if no summary is found
 
         Raises:
             CommandError: If dry-run fails
         """
-        cmd = ["apt-get", "install", "--autoremove", "-f"]
+        # A dry-run only depends on the requested packages and the installed
+        # system state, so an unchanged dpkg status means an unchanged plan
+        try:
+            status_mtime = os.stat(DPKG_STATUS_FILE).st_mtime_ns
+        except OSError:
+            status_mtime = 0
+        cache_key = (tuple(sorted(packages)), status_mtime)
+        if cache_key in self._dry_run_cache:
+            return self._dry_run_cache[cache_key]
+
+        cmd = ["apt-get", *_APT_PARSE_OPTS, "install", "--autoremove", "-f"]
         cmd.extend(packages)
         cmd.append("--dry-run")
 
+        # Only keep what the summary and error reports need, rather than
+        # buffering the whole simulation. When grep is around, it drops the
+        # simulation lines before they reach Python; otherwise they are
+        # filtered here, as bytes, so only the kept lines get decoded.
+        # grep must not block-buffer its output, or progress stalls.
+        filter_cmd = None
+        if self.check_command_exists("grep"):
+            filter_cmd = ["grep", "--line-buffered", "-a", "-v", "-E",
+                          _SIMULATION_LINE_PATTERN]
+        output_lines = []
         try:
-            result = self.run_command(
-                cmd,
-                text=True,
-                capture_output=True,
-                check=True
-            )
-            return self.parse_apt_output(result.stdout)
+            for line in self.stream_command(
+                cmd, text=False, filter_cmd=filter_cmd, env=_APT_PARSE_ENV
+            ):
+                if not line.startswith(_SIMULATION_PREFIXES):
+                    output_lines.append(line)
+                    if on_progress is not None:
+                        on_progress(line.decode(errors="replace").strip())
         except subprocess.CalledProcessError as e:
             raise CommandError(
                 f"APT dry-run failed: {' '.join(cmd)}",
                 stderr=e.stderr,
-                stdout=e.stdout
+                stdout=b"".join(output_lines).decode(errors="replace")
             )
+        summary = self.parse_apt_output(
+            b"".join(output_lines).decode(errors="replace"))
+        self._dry_run_cache[cache_key] = summary
+        return summary
 
-    def run_apt_install(self, packages: List[str]) -> None:
+    def run_apt_install(
+        self,
+        packages: List[str],
+        only_requested: bool = False
+    ) -> None:
         """Execute APT install command.
 
         Args:
             packages: List of package names
+            only_requested: Skip autoremove and fix-broken handling
 
         Raises:
             CommandError: If installation fails
         """
-        cmd = ["sudo", "apt-get", "install", "--autoremove", "-f", "-y"]
-        if console_module.quiet:
-            cmd.append("-qq")
-        cmd.extend(packages)
+        cmd = self._install_cmd(packages, only_requested)
 
         try:
             self.run_command(cmd, check=True)
@@ -131,3 +302,339 @@ class AptCommandRunner:
                 stderr=e.stderr,
                 stdout=e.stdout
             )
+        self._dry_run_cache.clear()
+
+    @staticmethod
+    def _install_cmd(
+        packages: List[str],
+        only_requested: bool = False
+    ) -> List[str]:
+        """Build the apt-get command line for a real install.
+
+        With ``only_requested``, apt neither autoremoves unrelated packages
+        nor tries to fix broken ones, so nothing beyond the given packages
+        (and their missing dependencies) is touched.
+        """
+        cmd = [*_sudo_prefix(), "apt-get", "install", "-y"]
+        if not only_requested:
+            cmd[-1:-1] = ["--autoremove", "-f"]
+        if console_module.quiet:
+            cmd.append("-qq")
+        cmd.extend(packages)
+        return cmd
+
+    def exec_apt_install(
+        self,
+        packages: List[str],
+        cleanup_dir: Optional[Path] = None,
+        only_requested: bool = False
+    ) -> NoReturn:
+        """Replace the current process with the final APT install.
+
+        For the last step of a command, there is no reason to keep the
+        Python interpreter resident while apt and dpkg run. The exit status
+        of the process becomes that of apt.
+
+        Args:
+            packages: List of package names
+            cleanup_dir: Directory to delete once apt has finished, since no
+                Python code runs after the exec to clean it up
+            only_requested: Skip autoremove and fix-broken handling
+        """
+        cmd = self._install_cmd(packages, only_requested)
+        if cleanup_dir is not None:
+            # The EXIT trap keeps apt's exit status. Handling INT and TERM
+            # (rather than ignoring them, which apt would inherit) makes the
+            # shell exit through that trap on Ctrl-C too.
+            cmd = ["sh", "-c",
+                   'dir=$1; shift; trap \'rm -rf -- "$dir"\' EXIT; '
+                   "trap 'exit 130' INT; trap 'exit 143' TERM; \"$@\"",
+                   "sh", str(cleanup_dir), *cmd]
+
+        from .rootlock import keep_lock_across_exec
+
+        # Only apt itself may inherit the lock, not the children run before
+        keep_lock_across_exec()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            os.execvp(cmd[0], cmd)
+        except OSError as e:
+            raise CommandError(f"Failed to execute {cmd[0]}: {e}")
+
+    @staticmethod
+    def _change_specs(installs: List[str], removals: List[str]) -> List[str]:
+        """Encode installs and removals as one APT package list.
+
+        APT removes a package when its name carries a trailing ``-``, so a
+        mixed change set can be handed to a single ``apt-get install``.
+        The list is deduplicated and sorted, which gives the same command
+        line and dry-run cache key for the same change set.
+        """
+        specs = list(installs) + [f"{pkg}-" for pkg in removals]
+        return sorted(dict.fromkeys(specs))
+
+    def preview_changes(
+        self,
+        installs: List[str],
+        removals: List[str],
+        on_progress: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """Dry-run a combined install/remove transaction.
+
+        Args:
+            installs: Package names or .deb paths to install
+            removals: Package names to remove
+            on_progress: Called with apt's output lines as they arrive
+
+        Returns:
+            Package change summary, an empty string if nothing would
+            change, or None if no summary is found
+
+        Raises:
+            CommandError: If dry-run fails
+        """
+        return self.run_apt_dry_run(
+            self._change_specs(installs, removals), on_progress)
+
+    def _query_installed(self, packages: Iterable[str]) -> Dict[str, str]:
+        """Query dpkg's database for the fully installed packages among some.
+
+        Answered with a single ``dpkg-query`` call, without loading APT's
+        cache.
+
+        Returns:
+            The Depends field of each package in the "installed" state
+        """
+        packages = list(packages)
+        if not packages:
+            return {}
+        try:
+            # Exits non-zero if any name is unknown, but still reports the rest
+            result = self.run_command(
+                ["dpkg-query", "-W",
+                 "-f=${Package}\t${db:Status-Status}\t${Depends}\n",
+                 *packages],
+                capture_output=True,
+                text=True,
+                check=False
+            )
+        except CommandError:
+            return {}
+        installed = {}
+        for line in result.stdout.splitlines():
+            name, _, rest = line.partition("\t")
+            status, _, depends = rest.partition("\t")
+            if status == "installed":
+                installed[name] = depends
+        return installed
+
+    def get_installed_packages(self, packages: Iterable[str]) -> FrozenSet[str]:
+        """Return the subset of packages that are fully installed.
+
+        Args:
+            packages: Package names to check
+
+        Returns:
+            Names of the packages in the "installed" state
+        """
+        return frozenset(self._query_installed(packages))
+
+    def get_installed_depends(self, packages: Iterable[str]) -> Dict[str, str]:
+        """Return the Depends field of the fully installed packages among some.
+
+        Args:
+            packages: Package names to check
+
+        Returns:
+            Depends field by package name, for packages in the "installed"
+            state; packages without dependencies map to an empty string
+        """
+        return self._query_installed(packages)
+
+    def get_package_versions(self, packages: Iterable[str]) -> Dict[str, str]:
+        """Return the versions dpkg has of some packages, in any state.
+
+        Answered with a single ``dpkg-query`` call. Half-installed and
+        unpacked packages are included, since apt compares against them too.
+
+        Args:
+            packages: Package names to check
+
+        Returns:
+            Version by package name, for the packages dpkg has a version of
+        """
+        packages = list(packages)
+        if not packages:
+            return {}
+        try:
+            # Exits non-zero if any name is unknown, but still reports the rest
+            result = self.run_command(
+                ["dpkg-query", "-W", "-f=${Package}\t${Version}\n", *packages],
+                capture_output=True,
+                text=True,
+                check=False
+            )
+        except CommandError:
+            return {}
+        versions = {}
+        for line in result.stdout.splitlines():
+            name, _, version = line.partition("\t")
+            if version:
+                versions[name] = version
+        return versions
+
+    def apply_changes(
+        self,
+        installs: List[str],
+        removals: List[str],
+        exec_replace: bool = False,
+        cleanup_dir: Optional[Path] = None,
+        only_requested: bool = False,
+        summary: Optional[str] = None
+    ) -> None:
+        """Apply a combined install/remove transaction in one apt run.
+
+        Args:
+            installs: Package names or .deb paths to install
+            removals: Package names to remove
+            exec_replace: Replace the current process with apt instead of
+                waiting for it; see :meth:`exec_apt_install`
+            cleanup_dir: Directory to delete after an exec'd apt run
+            only_requested: Skip autoremove and fix-broken handling
+            summary: Dry-run summary of this transaction, if one was made
+
+        Raises:
+            CommandError: If the transaction fails
+        """
+        packages = self._change_specs(installs, removals)
+        # With only_requested, every dependency is installed already
+        if not only_requested and self._may_download(installs, summary):
+            self.prefetch_archives(packages)
+        if exec_replace:
+            self.exec_apt_install(packages, cleanup_dir, only_requested)
+        self.run_apt_install(packages, only_requested)
+
+    @staticmethod
+    def _may_download(installs: List[str], summary: Optional[str]) -> bool:
+        """Tell whether a transaction may fetch archives from a mirror.
+
+        Local .deb files count as installed or upgraded packages too, so only
+        packages beyond them are downloaded. Without a summary, a download is
+        assumed whenever something is installed.
+        """
+        if not installs:
+            return False
+        match = _SUMMARY_COUNTS_RE.search(summary or "")
+        if match is None:
+            return True
+        local = sum(1 for spec in installs if spec.endswith(".deb"))
+        return int(match.group(1)) + int(match.group(2)) > local
+
+    @staticmethod
+    def _archive_matches(path: str, algorithm: str, digest: str) -> bool:
+        """Check a downloaded archive against its hash from --print-uris."""
+        try:
+            with open(path, "rb") as f:
+                actual = hashlib.new(algorithm)
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    actual.update(chunk)
+        except OSError:
+            return False
+        return actual.hexdigest() == digest
+
+    def prefetch_archives(self, packages: List[str]) -> None:
+        """Download the archives of a transaction in parallel with aria2c.
+
+        apt fetches archives one mirror connection at a time. When aria2c is
+        available, the archive URIs are resolved up front and downloaded
+        concurrently, so the following apt run only has to verify them and
+        hand them to dpkg. Downloads land in a staging directory first, and
+        only complete archives whose hash matches are moved into APT's cache,
+        since apt takes an archive of the right size there as downloaded.
+        Resolving the URIs costs one more solver run, which pays off only
+        when there is something to download. This is best effort: anything
+        that fails to download here, or a cache locked by another apt, is
+        left to apt as usual.
+
+        Args:
+            packages: APT package list of the upcoming transaction
+        """
+        if not self.check_command_exists("aria2c"):
+            return
+
+        cmd = ["apt-get", *_APT_PARSE_OPTS, "install", "--autoremove", "-f",
+               "--print-uris"]
+        cmd.extend(packages)
+        try:
+            result = self.run_command(
+                cmd,
+                text=True,
+                capture_output=True,
+                check=True,
+                env=_APT_PARSE_ENV
+            )
+        except (CommandError, subprocess.CalledProcessError):
+            return
+
+        # Archives without a hash to check them against are left to apt
+        entries = []
+        expected: Dict[str, Tuple[str, str]] = {}
+        for line in result.stdout.splitlines():
+            match = _PRINT_URIS_RE.match(line)
+            if not match or match.group(3) not in _PRINT_URIS_HASHES:
+                continue
+            uri, filename, hash_name, digest = match.groups()
+            algorithm, aria2_name = _PRINT_URIS_HASHES[hash_name]
+            entries.append(
+                f"{uri}\n  out={filename}\n  checksum={aria2_name}={digest}")
+            expected[filename] = (algorithm, digest)
+
+        if not entries:
+            return
+
+        # Hold the cache lock like apt does while writing into it, and give
+        # it back before apt runs
+        try:
+            lock_fd = os.open(APT_ARCHIVES_LOCK, os.O_RDWR | os.O_CREAT, 0o640)
+        except OSError:
+            return
+        try:
+            try:
+                fcntl.lockf(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                staging = tempfile.mkdtemp(prefix="bdapt-", dir=APT_PARTIAL_DIR)
+            except OSError:
+                return
+            try:
+                with tempfile.NamedTemporaryFile("w", suffix=".txt") as uri_file:
+                    uri_file.write("\n".join(entries) + "\n")
+                    uri_file.flush()
+                    with console.status(f"Downloading {len(entries)} archives..."):
+                        self.run_command(
+                            [*_sudo_prefix(), "aria2c", "-x2", "-s2", "-j4", "-q",
+                             "--file-allocation=none",
+                             "--auto-file-renaming=false",
+                             "--allow-overwrite=true",
+                             "-d", staging, "-i", uri_file.name],
+                            check=False,
+                            capture_output=True,
+                        )
+
+                fetched = 0
+                for filename, (algorithm, digest) in expected.items():
+                    path = os.path.join(staging, filename)
+                    # A control file next to it marks an unfinished download
+                    if (os.path.exists(f"{path}.aria2")
+                            or not self._archive_matches(path, algorithm, digest)):
+                        continue
+                    os.replace(path, os.path.join(APT_ARCHIVES_DIR, filename))
+                    fetched += 1
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        finally:
+            os.close(lock_fd)
+
+        if fetched < len(expected):
+            missing = len(expected) - fetched
+            console.print(
+                f"[yellow]Could not prefetch {missing} archive{missing != 1 and 's' or ''}, apt will download {missing != 1 and 'them' or 'it'}.[/yellow]")
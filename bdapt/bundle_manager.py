@@ -1,18 +1,16 @@
 """High-level bundle management operations."""
 
-from typing import List, Optional
+from functools import cached_property, wraps
+from typing import (TYPE_CHECKING, Any, Callable, Dict, List, NoReturn,
+                    Optional, Tuple, TypeVar, cast)
 
 import typer
-from rich.panel import Panel
-from rich.prompt import Confirm
-from rich.tree import Tree
+from rich.markup import escape
 
-from .apt_operations import AptCommandRunner
 from . import console as console_module
 from .console import console
-from .exceptions import CommandError
-from .metapackage import MetapackageContext
-from .models import Bundle, PackageSpec
+from .exceptions import BdaptError, CommandError
+from .models import Bundle, BundleStorage, PackageSpec
 from .storage import BundleStore
 from .validators import (
     validate_bundle_name,
@@ -20,6 +18,37 @@ from .validators import (
     validate_package_names,
 )
 
+if TYPE_CHECKING:
+    from rich.status import Status
+
+    from .apt_operations import AptCommandRunner
+
+# Spec of packages added without constraints, shared since specs are frozen
+_DEFAULT_SPEC = PackageSpec()
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _handles_bdapt(fn: _F) -> _F:
+    """Report a bdapt error escaping a public operation and exit.
+
+    The process exits with the error's exit code. Errors that were already
+    shown are not printed again.
+    """
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return fn(*args, **kwargs)
+        except BdaptError as e:
+            if not e.displayed:
+                if isinstance(e, CommandError):
+                    e.print()
+                else:
+                    console.print(f"[red]Error: {escape(e.message)}[/red]")
+            raise typer.Exit(e.exit_code)
+
+    return cast(_F, wrapper)
+
 
 class BundleManager:
     """Manages high-level bundle operations."""
@@ -32,63 +61,204 @@ class BundleManager:
 
         Args:
             store: Bundle storage instance
-            console: Rich console for output
+
+        Output goes through the process-wide console from
+        :mod:`bdapt.console`, so no console is passed around.
         """
         self.store = store or BundleStore()
-        self.apt_runner = AptCommandRunner()
+        self._storage_cache: Optional[BundleStorage] = None
+        self._storage_key: Optional[Tuple[int, int]] = None
+
+    @cached_property
+    def apt_runner(self) -> "AptCommandRunner":
+        """APT command runner, created on first use.
+
+        Read-only commands never touch apt, so they skip importing the
+        apt and metapackage modules altogether.
+        """
+        from .apt_operations import AptCommandRunner
+
+        return AptCommandRunner()
+
+    def _get_storage(self) -> BundleStorage:
+        """Load bundle storage, reusing the parsed copy while the file is unchanged."""
+        key = self.store.file_key()
+        if self._storage_cache is None or key != self._storage_key:
+            self._storage_cache = self.store.load()
+            self._storage_key = key
+        return self._storage_cache
+
+    def _save_storage(self, storage: BundleStorage) -> None:
+        """Save bundle storage and keep it as the cached copy.
+
+        What was just written needs no parsing back, so later reads in the
+        same command reuse it.
+        """
+        self.store.save(storage)
+        self._storage_cache = storage
+        self._storage_key = self.store.file_key()
 
     def _confirm_operation(self, summary: str) -> None:
+        # Imported here, as only commands that change the system prompt
+        from rich.panel import Panel
+
         console.print(Panel.fit(summary))
-        response = Confirm.ask(
-            "Proceed with these changes? [y/N]: ", default=False)
+        try:
+            response = typer.confirm(
+                "Proceed with these changes?", default=False)
+        except typer.Abort:
+            # End of input or Ctrl-C at the prompt
+            response = False
         if not response:
             raise typer.Exit(130)
 
-    def _install_metapackage(
+    @staticmethod
+    def _bundle_not_found(bundle_name: str) -> NoReturn:
+        console.print(
+            f"[red]Error: Bundle '{bundle_name}' does not exist[/red]")
+        raise typer.Exit(1)
+
+    def _require_bundle(self, bundle_name: str) -> Bundle:
+        """Look up a stored bundle, exiting with an error if there is none."""
+        bundle = self._get_storage().bundles.get(bundle_name)
+        if bundle is None:
+            self._bundle_not_found(bundle_name)
+        return bundle
+
+    @staticmethod
+    def _progress_to(status: "Status", message: str) -> Callable[[str], None]:
+        """Return a callback that shows apt's latest output line in a status."""
+        def update(line: str) -> None:
+            if line:
+                status.update(f"{message} [dim]{escape(line)}[/dim]")
+        return update
+
+    def _all_installed(self, bundle: Bundle) -> bool:
+        """Check if every package of a bundle is installed, unversioned."""
+        if any(spec.version for spec in bundle.packages.values()):
+            return False
+        installed = self.apt_runner.get_installed_packages(bundle.packages)
+        return installed.issuperset(bundle.packages)
+
+    def _out_of_sync(self, bundles: Dict[str, Bundle]) -> Dict[str, Bundle]:
+        """Select the bundles whose installed metapackage does not match them.
+
+        A bundle is in sync when its metapackage is installed with the
+        Depends line the bundle would generate now, and every package of the
+        bundle is installed.
+        """
+        from .metapackage import MetapackageContext
+
+        metapackages = {
+            name: MetapackageContext.get_metapackage_name(name)
+            for name in bundles
+        }
+        # One dpkg query answers for the metapackages and their packages
+        installed = self.apt_runner.get_installed_depends(
+            {pkg for bundle in bundles.values() for pkg in bundle.packages}
+            .union(metapackages.values()))
+        return {
+            name: bundle for name, bundle in bundles.items()
+            if installed.get(metapackages[name]) != bundle.depends_string
+            or not installed.keys() >= bundle.packages.keys()
+        }
+
+    def _install_metapackages(
         self,
-        bundle_name: str,
-        bundle: Bundle,
-        ignore_errors: bool = False
+        bundles: Dict[str, Bundle],
+        ignore_errors: bool = False,
+        exec_replace: bool = False,
+        add_only: bool = False
     ) -> None:
-        """Create and install a metapackage for the given bundle.
+        """Create and install the metapackages for the given bundles.
 
-        Performs: dry-run → confirmation → installation
-        """
-        metapackage_ctx = MetapackageContext(
-            bundle_name, bundle, self.apt_runner)
+        Performs: dry-run → confirmation → installation, as a single apt
+        transaction for all bundles.
 
-        with metapackage_ctx as deb_file:
-            # Dry-run to preview changes
+        With ``exec_replace``, the installation replaces the bdapt process,
+        so nothing after this call runs. ``add_only`` tells that the bundles
+        only gained packages since their metapackages were last installed.
+
+        Args:
+            bundles: Bundle definitions by bundle name
+        """
+        from .metapackage import MetapackageContext
+
+        sync_args = " ".join(bundles)
+        storage = self._get_storage()
+        # The stored counter goes back when bundles.json is restored or
+        # recreated, and building below an installed metapackage would be
+        # a downgrade, so continue from the highest of them
+        installed = self.apt_runner.get_package_versions(
+            MetapackageContext.get_metapackage_name(name) for name in bundles)
+        installed_seq = max(
+            map(MetapackageContext.get_version_seq, installed.values()),
+            default=0)
+        last_seq = max(storage.version_seq, installed_seq)
+        metapackage_ctx = MetapackageContext(bundles, last_seq + 1)
+        storage.version_seq = last_seq + len(bundles)
+
+        # When packages are only added and all of them are installed
+        # already, the metapackages are the whole transaction: there is
+        # nothing to preview, and nothing for autoremove to pick up
+        direct = add_only and all(
+            self._all_installed(bundle) for bundle in bundles.values())
+
+        with metapackage_ctx as deb_files:
+            installs = [str(deb_file) for deb_file in deb_files]
+            # Dry-run to preview changes. Without a confirmation prompt the
+            # preview is never shown, so skip it and let a single apt run
+            # resolve and apply the changes.
             summary = None
-            try:
-                with console.status(f"Validating bundle [bold]{bundle_name}[/bold]..."):
-                    summary = self.apt_runner.run_apt_dry_run([str(deb_file)])
-            except KeyboardInterrupt:
-                console.print("[red]Dry-run interrupted by user.[/red]")
-                raise typer.Exit(130)
-            except CommandError as e:
-                if ignore_errors:
-                    console.print(
-                        "[yellow]Dry-run failed, but ignoring errors.[/yellow]")
-                else:
-                    e.print()
+            if not console_module.non_interactive and not direct:
+                try:
+                    message = f"Validating bundle [bold]{', '.join(bundles)}[/bold]..."
+                    with console.status(message) as status:
+                        summary = self.apt_runner.preview_changes(
+                            installs, [],
+                            on_progress=self._progress_to(status, message))
+                except KeyboardInterrupt:
+                    console.print("[red]Dry-run interrupted by user.[/red]")
                     raise typer.Exit(130)
-
-            # Confirm with user unless non-interactive or no changes
-            if summary and not console_module.non_interactive:
+                except CommandError as e:
+                    if ignore_errors:
+                        console.print(
+                            "[yellow]Dry-run failed, but ignoring errors.[/yellow]")
+                    else:
+                        e.print()
+                        raise typer.Exit(130)
+
+            # Confirm with user unless there are no changes
+            if summary:
                 self._confirm_operation(summary)
 
-            # Update bundle in store
-            storage = self.store.load()
-            storage.bundles[bundle_name] = bundle
-            self.store.save(storage)
+            # Without a dry-run, apt has not vetted the bundles yet, so keep
+            # what they replace in case the install fails
+            previous = None
+            if summary is None:
+                previous = {name: storage.bundles.get(name) for name in bundles}
+
+            # Update bundles in store
+            storage.bundles.update(bundles)
+            self._save_storage(storage)
 
-            # Install the metapackage
+            # The dry-run found nothing for apt to do
+            if summary == "":
+                return
+
+            # Install the metapackages
             try:
-                self.apt_runner.run_apt_install([str(deb_file)])
+                self.apt_runner.apply_changes(
+                    installs, [],
+                    # The exit status would be apt's, so keep bdapt around
+                    # when errors are to be ignored
+                    exec_replace=exec_replace and not ignore_errors,
+                    cleanup_dir=metapackage_ctx.temp_dir,
+                    only_requested=direct,
+                    summary=summary)
             except KeyboardInterrupt:
                 console.print("\n[red]Install interrupted by user.[/red]\n"
-                              f"[yellow]The system may be in an inconsistent state. Run [bold]bdapt sync {bundle_name}[/bold] to ensure integrity.[/yellow]")
+                              f"[yellow]The system may be in an inconsistent state. Run [bold]bdapt sync {sync_args}[/bold] to ensure integrity.[/yellow]")
                 raise typer.Exit(130)
             except CommandError as e:
                 if ignore_errors:
@@ -96,10 +266,33 @@ class BundleManager:
                         "[yellow]Install failed, but ignoring errors.[/yellow]")
                 else:
                     e.print()
-                    console.print(
-                        f"[yellow]The system may be in an inconsistent state. Run [bold]bdapt sync {bundle_name}[/bold] to ensure integrity.[/yellow]")
+                    if previous is not None:
+                        self._restore_bundles(previous)
+                        console.print(
+                            "[yellow]The bundle changes were not saved.[/yellow]")
+                    else:
+                        console.print(
+                            f"[yellow]The system may be in an inconsistent state. Run [bold]bdapt sync {sync_args}[/bold] to ensure integrity.[/yellow]")
                     raise typer.Exit(130)
 
+    def _restore_bundles(self, previous: Dict[str, Optional[Bundle]]) -> None:
+        """Put back stored bundle definitions, dropping those that were new."""
+        storage = self._get_storage()
+        for name, bundle in previous.items():
+            if bundle is None:
+                storage.bundles.pop(name, None)
+            else:
+                storage.bundles[name] = bundle
+        self._save_storage(storage)
+
+    @staticmethod
+    def _bundle_not_installed(bundle_name: str) -> NoReturn:
+        console.print(
+            f"[yellow]Bundle '{bundle_name}' exist in the bundle database, but not installed in the system. Perhaps you have a broken bundle?[/yellow]")
+        console.print(
+            f"[yellow]Run [bold]bdapt del -f {bundle_name}[/bold] to force removal, or [bold]bdapt sync {bundle_name}[/bold] to install it.[/yellow]")
+        raise typer.Exit(130)
+
     def _remove_metapackage(
         self,
         bundle_name: str,
@@ -107,62 +300,70 @@ class BundleManager:
     ) -> None:
         """Remove a metapackage from the system.
         """
+        from .metapackage import MetapackageContext
+
         metapackage_name = MetapackageContext.get_metapackage_name(bundle_name)
-        package_spec = metapackage_name + "-"  # APT syntax to remove package
 
-        # Dry-run to preview changes
+        # Dry-run to preview changes (skipped when nothing is confirmed)
         summary = None
-        try:
-            with console.status(f"Validating bundle [bold]{bundle_name}[/bold]..."):
-                summary = self.apt_runner.run_apt_dry_run([package_spec])
-        except KeyboardInterrupt:
-            console.print("[red]Dry-run interrupted by user.[/red]")
-            raise typer.Exit(130)
-        except CommandError as e:
-            if ignore_errors:
-                console.print(
-                    "[yellow]Dry-run failed, but ignoring errors.[/yellow]")
-            elif e.stderr and f"E: Unable to locate package {metapackage_name}" in e.stderr:
-                # If the package is not installed, we can just exit
-                console.print(
-                    f"[yellow]Bundle '{bundle_name}' exist in the bundle database, but not installed in the system. Perhaps you have a broken bundle?[/yellow]")
-                console.print(
-                    f"[yellow]Run [bold]bdapt del -f {bundle_name}[/bold] to force removal, or [bold]bdapt sync {bundle_name}[/bold] to install it.[/yellow]")
-                raise typer.Exit(130)
-            else:
-                e.print()
-                console.print(
-                    f"[yellow]If you believe this is a mistake, run [bold]bdapt del -f {bundle_name}[/bold] to force removal.[/yellow]")
+        if not console_module.non_interactive:
+            try:
+                message = f"Validating bundle [bold]{bundle_name}[/bold]..."
+                with console.status(message) as status:
+                    summary = self.apt_runner.preview_changes(
+                        [], [metapackage_name],
+                        on_progress=self._progress_to(status, message))
+            except KeyboardInterrupt:
+                console.print("[red]Dry-run interrupted by user.[/red]")
                 raise typer.Exit(130)
+            except CommandError as e:
+                if ignore_errors:
+                    console.print(
+                        "[yellow]Dry-run failed, but ignoring errors.[/yellow]")
+                elif e.stderr and f"E: Unable to locate package {metapackage_name}" in e.stderr:
+                    # If the package is not installed, we can just exit
+                    self._bundle_not_installed(bundle_name)
+                else:
+                    e.print()
+                    console.print(
+                        f"[yellow]If you believe this is a mistake, run [bold]bdapt del -f {bundle_name}[/bold] to force removal.[/yellow]")
+                    raise typer.Exit(130)
 
-        # Confirm with user unless non-interactive or no changes
-        if summary and not console_module.non_interactive:
+        # Confirm with user unless there are no changes
+        if summary:
             self._confirm_operation(summary)
-
-        # Execute the removal
-        try:
-            self.apt_runner.run_apt_install([package_spec])
-        except KeyboardInterrupt:
-            console.print("\n[red]Removal interrupted by user.[/red]\n"
-                          "[yellow]The system may be in an inconsistent state. "
-                          f"Run [bold]bdapt sync {bundle_name}[/bold] to rollback or [bold]bdapt del {bundle_name}[/bold] to try again.[/yellow]")
-            raise typer.Exit(130)
-        except CommandError as e:
-            if ignore_errors:
-                console.print(
-                    "[yellow]Removal failed, but ignoring errors.\n"
-                    "You may run [bold]apt autoremove[/bold] to clean up.[/yellow]")
-            else:
-                e.print()
-                console.print("[yellow]The system may be in an inconsistent state. "
-                              f"Run [bold]bdapt sync {bundle_name}[/bold] to rollback or [bold]bdapt del -f {bundle_name}[/bold] to force removal.[/yellow]")
+        elif summary is None and not ignore_errors:
+            # Without the dry-run, apt would only fail on a metapackage that
+            # is not installed; a single dpkg query tells it up front
+            if not self.apt_runner.get_installed_packages([metapackage_name]):
+                self._bundle_not_installed(bundle_name)
+
+        # Execute the removal, unless the dry-run found nothing to remove
+        if summary != "":
+            try:
+                self.apt_runner.apply_changes([], [metapackage_name])
+            except KeyboardInterrupt:
+                console.print("\n[red]Removal interrupted by user.[/red]\n"
+                              "[yellow]The system may be in an inconsistent state. "
+                              f"Run [bold]bdapt sync {bundle_name}[/bold] to rollback or [bold]bdapt del {bundle_name}[/bold] to try again.[/yellow]")
                 raise typer.Exit(130)
+            except CommandError as e:
+                if ignore_errors:
+                    console.print(
+                        "[yellow]Removal failed, but ignoring errors.\n"
+                        "You may run [bold]apt autoremove[/bold] to clean up.[/yellow]")
+                else:
+                    e.print()
+                    console.print("[yellow]The system may be in an inconsistent state. "
+                                  f"Run [bold]bdapt sync {bundle_name}[/bold] to rollback or [bold]bdapt del -f {bundle_name}[/bold] to force removal.[/yellow]")
+                    raise typer.Exit(130)
 
         # Update bundle in store
-        storage = self.store.load()
+        storage = self._get_storage()
         del storage.bundles[bundle_name]
-        self.store.save(storage)
+        self._save_storage(storage)
 
+    @_handles_bdapt
     def create_bundle(
         self,
         name: str,
@@ -173,10 +374,12 @@ class BundleManager:
         """Create a new bundle.
         """
         validate_bundle_name(name)
+        # Drop repeated names, keeping the order they were given in
+        packages = list(dict.fromkeys(packages))
         validate_package_list(packages, "bundle creation")
         validate_package_names(packages)
 
-        storage = self.store.load()
+        storage = self._get_storage()
 
         if name in storage.bundles:
             console.print(
@@ -185,17 +388,16 @@ class BundleManager:
 
         bundle = Bundle(
             description=description,
-            packages={pkg: PackageSpec() for pkg in packages}
+            packages=dict.fromkeys(packages, _DEFAULT_SPEC)
         )
 
-        self._install_metapackage(name, bundle, ignore_errors)
-
-        # Save bundle after successful installation
-        storage.bundles[name] = bundle
-        self.store.save(storage)
+        # Stores the bundle along with installing it
+        self._install_metapackages(
+            {name: bundle}, ignore_errors, add_only=True)
 
         console.print(f"[green]✓[/green] Created bundle '{name}'")
 
+    @_handles_bdapt
     def add_packages(
         self,
         bundle_name: str,
@@ -204,37 +406,35 @@ class BundleManager:
     ) -> None:
         """Add packages to an existing bundle.
         """
+        # Drop repeated names, keeping the order they were given in
+        packages = list(dict.fromkeys(packages))
         validate_package_list(packages, "adding packages")
         validate_package_names(packages)
 
-        storage = self.store.load()
-
-        if bundle_name not in storage.bundles:
-            console.print(
-                f"[red]Error: Bundle '{bundle_name}' does not exist[/red]")
-            raise typer.Exit(1)
-
-        bundle = storage.bundles[bundle_name]
-
-        # Add new packages (TODO: Parse version spec)
-        for pkg in packages:
-            bundle.packages[pkg] = PackageSpec()
+        bundle = self._require_bundle(bundle_name)
 
         # Verify packages not already exist in bundle
         for pkg in packages:
-            if pkg not in bundle.packages:
+            if pkg in bundle.packages:
                 console.print(
                     f"[red]Error: Package '{pkg}' already in bundle '{bundle_name}'[/red]")
                 raise typer.Exit(1)
 
-        self._install_metapackage(bundle_name, bundle, ignore_errors)
+        # Add new packages (TODO: Parse version spec). Bundles are replaced
+        # rather than mutated, see Bundle.depends_string
+        bundle = Bundle(
+            description=bundle.description,
+            packages={**bundle.packages,
+                      **dict.fromkeys(packages, _DEFAULT_SPEC)}
+        )
 
-        # Save bundle after successful installation
-        self.store.save(storage)
+        self._install_metapackages(
+            {bundle_name: bundle}, ignore_errors, add_only=True)
 
         console.print(
             f"[green]✓[/green] Added {len(packages)} package{len(packages) != 1 and 's' or ''} to bundle '{bundle_name}'")
 
+    @_handles_bdapt
     def remove_packages(
         self,
         bundle_name: str,
@@ -243,36 +443,33 @@ class BundleManager:
     ) -> None:
         """Remove packages from a bundle.
         """
+        # Drop repeated names, keeping the order they were given in
+        packages = list(dict.fromkeys(packages))
         validate_package_list(packages, "removing packages")
 
-        storage = self.store.load()
+        bundle = self._require_bundle(bundle_name)
 
-        if bundle_name not in storage.bundles:
+        # Verify packages exist in bundle
+        removed = set(packages)
+        missing = removed - bundle.packages.keys()
+        if missing:
             console.print(
-                f"[red]Error: Bundle '{bundle_name}' does not exist[/red]")
+                f"[red]Error: Package{len(missing) != 1 and 's' or ''} {', '.join(repr(pkg) for pkg in sorted(missing))} not in bundle '{bundle_name}'[/red]")
             raise typer.Exit(1)
 
-        bundle = storage.bundles[bundle_name]
-
-        # Verify packages exist in bundle
-        for pkg in packages:
-            if pkg not in bundle.packages:
-                console.print(
-                    f"[red]Error: Package '{pkg}' not in bundle '{bundle_name}'[/red]")
-                raise typer.Exit(1)
-
         # Remove packages from bundle definition
-        for pkg in packages:
-            del bundle.packages[pkg]
+        bundle = Bundle(
+            description=bundle.description,
+            packages={pkg: spec for pkg, spec in bundle.packages.items()
+                      if pkg not in removed}
+        )
 
-        self._install_metapackage(bundle_name, bundle, ignore_errors)
-
-        # Save bundle after successful installation
-        self.store.save(storage)
+        self._install_metapackages({bundle_name: bundle}, ignore_errors)
 
         console.print(
             f"[green]✓[/green] Removed {len(packages)} package{len(packages) != 1 and 's' or ''} from bundle '{bundle_name}'")
 
+    @_handles_bdapt
     def delete_bundle(
         self,
         bundle_name: str,
@@ -280,80 +477,104 @@ class BundleManager:
     ) -> None:
         """Delete a bundle completely.
         """
-        storage = self.store.load()
-
-        if bundle_name not in storage.bundles:
-            console.print(
-                f"[red]Error: Bundle '{bundle_name}' does not exist[/red]")
-            raise typer.Exit(1)
+        self._require_bundle(bundle_name)
 
-        # Remove metapackage
+        # Remove metapackage, which also removes the bundle from storage
         self._remove_metapackage(bundle_name, ignore_errors)
 
-        # Remove from storage
-        del storage.bundles[bundle_name]
-        self.store.save(storage)
-
         console.print(f"[green]✓[/green] Deleted bundle '{bundle_name}'")
 
-    def sync_bundle(
+    @_handles_bdapt
+    def sync_all(
         self,
-        bundle_name: str,
-        ignore_errors: bool = False
+        bundle_names: List[str],
+        ignore_errors: bool = False,
+        exec_replace: bool = False
     ) -> None:
-        """Force reinstall bundle to match definition.
+        """Reinstall bundles that differ from their definitions.
+
+        The metapackages are built concurrently and installed in a single
+        apt transaction, since apt itself cannot run in parallel. Bundles
+        whose installed metapackage already matches are skipped.
+
+        Args:
+            bundle_names: Names of the bundles to sync
+            ignore_errors: Continue past dry-run and install failures
+            exec_replace: Let apt replace the bdapt process for the install
         """
-        storage = self.store.load()
+        bundles = {name: self._require_bundle(name) for name in bundle_names}
 
-        if bundle_name not in storage.bundles:
-            console.print(
-                f"[red]Error: Bundle '{bundle_name}' does not exist[/red]")
-            raise typer.Exit(1)
+        # Bundles that already match what is installed need no apt run
+        stale = self._out_of_sync(bundles)
+        for bundle_name in bundles:
+            if bundle_name not in stale:
+                console.print(
+                    f"[green]✓[/green] Bundle '{bundle_name}' is already in sync")
+        if not stale:
+            return
 
-        bundle = storage.bundles[bundle_name]
+        # Once apt replaces the process, nothing after it prints, so say
+        # what is being synced up front
+        if exec_replace and not ignore_errors:
+            for bundle_name in stale:
+                console.print(f"Syncing bundle '{bundle_name}'...")
 
-        self._install_metapackage(bundle_name, bundle, ignore_errors)
+        self._install_metapackages(
+            stale, ignore_errors, exec_replace=exec_replace)
 
-        console.print(f"[green]✓[/green] Synced bundle '{bundle_name}'")
+        for bundle_name in stale:
+            console.print(f"[green]✓[/green] Synced bundle '{bundle_name}'")
 
+    @_handles_bdapt
     def list_bundles(self, tree: bool = False) -> None:
         """List all bundles."""
-        storage = self.store.load()
+        if not tree:
+            # The plain list only needs descriptions and package counts
+            summary = self.store.load_summary()
+
+            if not summary:
+                console.print("[yellow]No bundles found[/yellow]")
+                return
+
+            # Simple list view, rendered and written in one go
+            console.print("\n".join([
+                f"[bold]{name}[/bold] ({pkg_count} package{pkg_count != 1 and 's' or ''})"
+                + (f" [dim]{description}[/dim]" if description else "")
+                for name, (description, pkg_count) in summary.items()
+            ]))
+            return
+
+        from rich.tree import Tree
+
+        storage = self._get_storage()
 
         if not storage.bundles:
             console.print("[yellow]No bundles found[/yellow]")
             return
 
-        if tree:
-            # Create a tree view
-            root = Tree(
-                f"📦 [bold]{len(storage.bundles)} bundle{len(storage.bundles) != 1 and 's' or ''}[/bold]")
+        # Create a tree view
+        root = Tree(
+            f"📦 [bold]{len(storage.bundles)} bundle{len(storage.bundles) != 1 and 's' or ''}[/bold]")
 
-            for name, bundle in storage.bundles.items():
-                pkg_count = len(bundle.packages)
-                desc = f" [dim]{bundle.description}[/dim]" if bundle.description else ""
+        for name, bundle in storage.bundles.items():
+            pkg_count = len(bundle.packages)
+            desc = f" [dim]{bundle.description}[/dim]" if bundle.description else ""
 
-                # Add bundle as a branch
-                bundle_node = root.add(
-                    f"[bold cyan]{name}[/bold cyan] ({pkg_count} package{pkg_count != 1 and 's' or ''}){desc}"
-                )
+            # Add bundle as a branch
+            bundle_node = root.add(
+                f"[bold cyan]{name}[/bold cyan] ({pkg_count} package{pkg_count != 1 and 's' or ''}){desc}"
+            )
 
-                # Add packages as leaves
-                if bundle.packages:
-                    for pkg_name in sorted(bundle.packages.keys()):
-                        bundle_node.add(f"{pkg_name}")
-                else:
-                    bundle_node.add("[dim]No packages[/dim]")
+            # Add packages as leaves
+            if bundle.packages:
+                for pkg_name in bundle.sorted_packages:
+                    bundle_node.add(f"{pkg_name}")
+            else:
+                bundle_node.add("[dim]No packages[/dim]")
 
-            console.print(root)
-        else:
-            # Simple list view
-            for name, bundle in storage.bundles.items():
-                pkg_count = len(bundle.packages)
-                desc = f" [dim]{bundle.description}[/dim]" if bundle.description else ""
-                console.print(
-                    f"[bold]{name}[/bold] ({pkg_count} package{pkg_count != 1 and 's' or ''}){desc}")
+        console.print(root)
 
+    @_handles_bdapt
     def show_bundle(self, bundle_name: str) -> None:
         """Display detailed information about a bundle.
 
@@ -363,23 +584,23 @@ class BundleManager:
         Raises:
             typer.Exit: If bundle doesn't exist
         """
-        storage = self.store.load()
-
-        if bundle_name not in storage.bundles:
-            console.print(
-                f"[red]Error: Bundle '{bundle_name}' does not exist[/red]")
-            raise typer.Exit(1)
+        bundle = self.store.load_bundle(bundle_name)
 
-        bundle = storage.bundles[bundle_name]
+        if bundle is None:
+            self._bundle_not_found(bundle_name)
 
-        console.print(f"[bold]Bundle:[/bold] {bundle_name}")
         desc = bundle.description or "[dim]No description[/dim]"
-        console.print(f"[bold]Description:[/bold] {desc}")
+        lines = [
+            f"[bold]Bundle:[/bold] {bundle_name}",
+            f"[bold]Description:[/bold] {desc}",
+        ]
 
         if bundle.packages:
-            console.print(
-                f"[bold]Packages ({len(bundle.packages)}):[/bold]")
-            for pkg_name in sorted(bundle.packages.keys()):
-                console.print(f"  • {pkg_name}")
+            lines.append(f"[bold]Packages ({len(bundle.packages)}):[/bold]")
+            lines.extend(
+                f"  • {pkg_name}" for pkg_name in bundle.sorted_packages)
         else:
-            console.print("[yellow]No packages in bundle[/yellow]")
+            lines.append("[yellow]No packages in bundle[/yellow]")
+
+        # Rendered and written in one go
+        console.print("\n".join(lines))
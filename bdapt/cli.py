@@ -1,59 +1,163 @@
 """CLI interface for bdapt."""
 
+import mmap
+import os
 import subprocess
-from typing import List, Optional
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
 
 import typer
-from rich.traceback import install
 
 from bdapt.rootlock import aquire_root_and_lock
 
 from . import console as console_module
-from .bundle_manager import BundleManager
 from .console import console
-from .storage import BundleStore
 
-# Install rich traceback handler
-install(show_locals=True)
+if TYPE_CHECKING:
+    from .bundle_manager import BundleManager
+
+# Where APT keeps the data `apt-cache pkgnames` is answered from
+_PKGNAMES_SOURCES = ("/var/lib/apt/lists", "/var/lib/dpkg/status")
 
 app = typer.Typer(
     name="bdapt",
     help="Bundle APT: Group multiple Debian APT packages as bundles.",
     add_completion=True,
+    # Locals are only rendered with --debug, see main()
+    pretty_exceptions_show_locals=False,
 )
 
 
 def complete_bundle_name(incomplete: str) -> List[str]:
     """Completion function for bundle names."""
     try:
-        store = BundleStore()
-        storage = store.load()
-        bundle_names = list(storage.bundles.keys())
+        from .storage import BundleStore
+
+        bundle_names = BundleStore().load_names()
         return [name for name in bundle_names if name.startswith(incomplete)]
     except Exception:
         # If there's any error, return empty list
         return []
 
 
+def _pkgnames_cache_file() -> Path:
+    """Location of the cached list of APT package names."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    # Named apart from the unsorted list earlier releases kept
+    return Path(cache_home) / "bdapt" / "pkgnames.sorted"
+
+
+def _refresh_pkgnames(cache_file: Path, wait: bool) -> None:
+    """Regenerate the package name cache from ``apt-cache pkgnames``.
+
+    Names are stored one per line in byte order, so completion can
+    binary-search the file. The list is written to a temporary file and
+    renamed into place, so readers never see a partial list. An empty list,
+    as left by a failing ``apt-cache`` (the pipeline reports sort's status),
+    is discarded. Without ``wait``, the refresh runs detached and outlives
+    the completion process.
+
+    Raises:
+        subprocess.TimeoutExpired: If ``wait`` is set and the refresh takes
+            longer than 3 seconds
+    """
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    cmd = ["sh", "-c",
+           'apt-cache pkgnames | LC_ALL=C sort > "$1" && [ -s "$1" ]'
+           ' && mv -f "$1" "$2" || rm -f "$1"',
+           "sh", str(tmp_file), str(cache_file)]
+    if wait:
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=3)
+        except subprocess.TimeoutExpired:
+            # The shell was killed before it could rename or remove the list
+            tmp_file.unlink(missing_ok=True)
+            raise
+    else:
+        subprocess.Popen(cmd, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def _pkgnames_file() -> Path:
+    """Return the on-disk cache of APT package names, building it if needed.
+
+    The cache is built on first use. Once APT's lists or dpkg's status are
+    newer than the cache, the stale list is still served while a fresh one
+    is generated in the background.
+    """
+    cache_file = _pkgnames_cache_file()
+    try:
+        cache_mtime: Optional[float] = cache_file.stat().st_mtime
+    except OSError:
+        cache_mtime = None
+
+    if cache_mtime is None:
+        _refresh_pkgnames(cache_file, wait=True)
+    else:
+        source_mtime = 0.0
+        for source in _PKGNAMES_SOURCES:
+            try:
+                source_mtime = max(source_mtime, os.stat(source).st_mtime)
+            except OSError:
+                pass
+        if source_mtime > cache_mtime:
+            _refresh_pkgnames(cache_file, wait=False)
+
+    return cache_file
+
+
+def _find_first_line(buf: mmap.mmap, key: bytes) -> int:
+    """Find the offset of the first line not sorting before ``key``.
+
+    Args:
+        buf: Newline-separated lines in byte order
+        key: Line content to search for
+
+    Returns:
+        Offset of the line's first byte; the buffer size if there is none
+    """
+    lo, hi = 0, len(buf)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = buf.rfind(b"\n", 0, mid) + 1
+        end = buf.find(b"\n", start)
+        if end == -1:
+            end = len(buf)
+        if buf[start:end] < key:
+            lo = end + 1
+        else:
+            hi = start
+    return min(lo, len(buf))
+
+
 def complete_package_name(incomplete: str) -> List[str]:
     """Completion function for APT package names."""
     try:
-        # Use apt-cache to get package names
-        # This is a simplified approach - for better performance you might want to cache this
-        result = subprocess.run(
-            ["apt-cache", "pkgnames", incomplete],
-            capture_output=True,
-            text=True,
-            timeout=3
-        )
-        if result.returncode == 0:
-            packages = result.stdout.strip().split('\n')
-            # Filter empty strings and limit results for performance
-            packages = [pkg for pkg in packages if pkg][:50]
-            return packages
-    except (subprocess.TimeoutExpired, subprocess.SubprocessError, FileNotFoundError):
-        pass
-    return []
+        # Search the sorted cache in place rather than reading every name;
+        # limit results for performance
+        with open(_pkgnames_file(), "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            prefix = incomplete.encode("utf-8")
+            matches: List[str] = []
+            pos = _find_first_line(buf, prefix)
+            while pos < len(buf) and len(matches) < 50:
+                end = buf.find(b"\n", pos)
+                if end == -1:
+                    end = len(buf)
+                line = buf[pos:end]
+                if not line.startswith(prefix):
+                    break
+                matches.append(line.decode("utf-8"))
+                pos = end + 1
+            return matches
+    except (subprocess.TimeoutExpired, subprocess.SubprocessError, OSError,
+            ValueError):
+        # mmap raises ValueError on an empty file
+        return []
 
 
 def complete_bundle_package_name(ctx: typer.Context, incomplete: str) -> List[str]:
@@ -67,19 +171,24 @@ def complete_bundle_package_name(ctx: typer.Context, incomplete: str) -> List[st
         if not bundle_name:
             return []
 
-        store = BundleStore()
-        storage = store.load()
+        from .storage import BundleStore
 
-        if bundle_name not in storage.bundles:
-            return []
-
-        bundle = storage.bundles[bundle_name]
-        package_names = list(bundle.packages.keys())
+        package_names = BundleStore().load_packages(bundle_name)
         return [name for name in package_names if name.startswith(incomplete)]
     except Exception:
         return []
 
 
+@lru_cache(maxsize=1)
+def _manager() -> "BundleManager":
+    """The bundle manager shared by the commands of this process."""
+    # Imported here so --version and shell completion skip the models, apt
+    # helpers and everything else the manager pulls in
+    from .bundle_manager import BundleManager
+
+    return BundleManager()
+
+
 def version_callback(value: bool) -> None:
     """Show version information."""
     if value:
@@ -111,10 +220,24 @@ def main(
         "--non-interactive",
         help="Skip all confirmation prompts",
     ),
+    debug_flag: bool = typer.Option(
+        False,
+        "--debug",
+        help="Show full tracebacks on errors",
+    ),
 ) -> None:
     """bdapt: Group multiple Debian APT packages as bundles."""
+    # Detailed tracebacks are opt-in: rendering every frame's locals is slow
+    # and buries the error message
+    if debug_flag or os.environ.get("BDAPT_DEBUG") == "1":
+        from rich.traceback import install
+
+        install(show_locals=True)
+
     console_module.quiet = quiet_flag
-    console_module.non_interactive = non_interactive_flag
+    # Nobody can answer a prompt on a pipe or closed stdin
+    console_module.non_interactive = (
+        non_interactive_flag or sys.stdin is None or not sys.stdin.isatty())
 
     if quiet_flag:
         console.quiet = True
@@ -143,13 +266,8 @@ def new(
     ),
 ) -> None:
     """Create and install new bundle."""
-    if not packages:
-        console.print(
-            "[red]Error:[/red] At least one package must be specified")
-        raise typer.Exit(1)
-
     aquire_root_and_lock()
-    manager = BundleManager()
+    manager = _manager()
     manager.create_bundle(bundle, packages, desc or "",
                           ignore_errors=ignore_errors)
 
@@ -168,13 +286,8 @@ def add(
     ),
 ) -> None:
     """Add packages to a bundle."""
-    if not packages:
-        console.print(
-            "[red]Error:[/red] At least one package must be specified")
-        raise typer.Exit(1)
-
     aquire_root_and_lock()
-    manager = BundleManager()
+    manager = _manager()
     manager.add_packages(bundle, packages, ignore_errors=ignore_errors)
 
 
@@ -192,13 +305,8 @@ def rm(
     ),
 ) -> None:
     """Remove packages from a bundle."""
-    if not packages:
-        console.print(
-            "[red]Error:[/red] At least one package must be specified")
-        raise typer.Exit(1)
-
     aquire_root_and_lock()
-    manager = BundleManager()
+    manager = _manager()
     manager.remove_packages(bundle, packages, ignore_errors=ignore_errors)
 
 
@@ -215,7 +323,7 @@ def delete(
 ) -> None:
     """Delete the bundle."""
     aquire_root_and_lock()
-    manager = BundleManager()
+    manager = _manager()
     manager.delete_bundle(bundle, ignore_errors=ignore_errors)
 
 
@@ -229,7 +337,7 @@ def ls(
     ),
 ) -> None:
     """List all bundles."""
-    manager = BundleManager()
+    manager = _manager()
     manager.list_bundles(tree=tree)
 
 
@@ -239,14 +347,14 @@ def show(
                                  autocompletion=complete_bundle_name),
 ) -> None:
     """Display bundle contents."""
-    manager = BundleManager()
+    manager = _manager()
     manager.show_bundle(bundle)
 
 
 @app.command()
 def sync(
-    bundle: str = typer.Argument(..., help="Bundle name",
-                                 autocompletion=complete_bundle_name),
+    bundles: List[str] = typer.Argument(..., help="Bundle names",
+                                        autocompletion=complete_bundle_name),
     ignore_errors: bool = typer.Option(
         False,
         "-f",
@@ -254,10 +362,22 @@ def sync(
         help="Ignore errors",
     ),
 ) -> None:
-    """Force reinstall bundle to match definition."""
+    """Reinstall bundles that differ from their definitions."""
     aquire_root_and_lock()
-    manager = BundleManager()
-    manager.sync_bundle(bundle, ignore_errors=ignore_errors)
+    manager = _manager()
+    manager.sync_all(bundles, ignore_errors=ignore_errors,
+                     exec_replace=True)
+
+
+@app.command(name="_warm-completions", hidden=True)
+def warm_completions() -> None:
+    """Rebuild the package name cache used by shell completion.
+
+    Meant to be started in the background from a shell's init file, e.g.
+    ``(bdapt _warm-completions &)``, so the first Tab press finds the
+    cache ready instead of waiting for apt-cache.
+    """
+    _refresh_pkgnames(_pkgnames_cache_file(), wait=False)
 
 
 if __name__ == "__main__":
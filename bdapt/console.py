@@ -1,6 +1,33 @@
-from rich.console import Console
+from typing import TYPE_CHECKING, Any, Optional
 
-console = Console()
+if TYPE_CHECKING:
+    from rich.console import Console
+
+
+class _LazyConsole:
+    """The shared rich Console, created on first use.
+
+    Importing rich's console machinery is a good part of bdapt's start-up
+    time, and shell completion never prints anything.
+    """
+
+    _console: Optional["Console"] = None
+
+    def _get(self) -> "Console":
+        if _LazyConsole._console is None:
+            from rich.console import Console
+
+            _LazyConsole._console = Console()
+        return _LazyConsole._console
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._get(), name, value)
+
+
+console: "Console" = _LazyConsole()  # type: ignore[assignment]
 
 # Global flags
 quiet = False
@@ -0,0 +1,89 @@
+"""In-memory construction of binary Debian packages."""
+
+import gzip
+import io
+import tarfile
+from typing import Dict, List
+
+
+def _tar_gz(files: Dict[str, bytes]) -> bytes:
+    """Build a gzipped tarball of root-owned regular files."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w", format=tarfile.GNU_FORMAT) as tar:
+        root = tarfile.TarInfo("./")
+        root.type = tarfile.DIRTYPE
+        root.mode = 0o755
+        tar.addfile(root)
+        for name, data in files.items():
+            info = tarfile.TarInfo(f"./{name}")
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+    return gzip.compress(buf.getvalue(), mtime=0)
+
+
+_METAPACKAGE_CONTROL = (
+    "Package: {name}\n"
+    "Version: {version}\n"
+    "Maintainer: bdapt <bdapt@localhost>\n"
+    "Architecture: all\n"
+    "Description: {description}\n"
+)
+
+# A metapackage ships no files, and the empty tarball is the same every time
+_EMPTY_DATA_TAR_GZ = _tar_gz({})
+
+
+def _ar_member(name: str, data: bytes) -> List[bytes]:
+    """Encode one member of an ar archive, in the format dpkg expects."""
+    header = f"{name:<16}{0:<12}{0:<6}{0:<6}{100644:<8}{len(data):<10}`\n"
+    parts = [header.encode("ascii"), data]
+    if len(data) % 2:
+        parts.append(b"\n")
+    return parts
+
+
+def build_deb(control_content: str) -> bytes:
+    """Build a binary package with the given control file and no payload.
+
+    A .deb is an ar archive of ``debian-binary``, ``control.tar.gz`` and
+    ``data.tar.gz``.
+
+    Args:
+        control_content: Contents of the package's control file
+
+    Returns:
+        The complete .deb file
+    """
+    control_tar_gz = _tar_gz({"control": control_content.encode("utf-8")})
+    return b"".join([
+        b"!<arch>\n",
+        *_ar_member("debian-binary", b"2.0\n"),
+        *_ar_member("control.tar.gz", control_tar_gz),
+        *_ar_member("data.tar.gz", _EMPTY_DATA_TAR_GZ),
+    ])
+
+
+def build_metapackage_deb(
+    name: str,
+    version: str,
+    description: str,
+    depends: str
+) -> bytes:
+    """Build a metapackage that only depends on other packages.
+
+    Args:
+        name: Package name
+        version: Package version
+        description: One-line package description
+        depends: Depends field; omitted from the package if empty
+
+    Returns:
+        The complete .deb file
+    """
+    control = _METAPACKAGE_CONTROL.format(
+        name=name, version=version, description=description)
+    if depends:
+        control += f"Depends: {depends}\n"
+
+    return build_deb(control)
@@ -2,8 +2,6 @@
 
 from typing import Optional
 
-from rich.panel import Panel
-
 from .console import console
 
 
@@ -51,6 +49,8 @@ class CommandError(BdaptError):
         if self.stderr:
             detail += f"[red]{self.stderr.strip()}[/red]"
         if detail:
+            from rich.panel import Panel
+
             console.print(Panel(detail))
         console.print(f"[red]{self.message}[/red]")
 
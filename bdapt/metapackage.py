@@ -1,11 +1,11 @@
-import shutil
+import os
 import tempfile
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from textwrap import dedent
+from typing import Dict, List, Optional
 
-from .apt_operations import AptCommandRunner
 from .console import console
+from .deb_builder import build_metapackage_deb
 from .exceptions import CommandError
 from .models import Bundle
 
@@ -17,133 +17,114 @@ class MetapackageContext:
 
     def __init__(
         self,
-        bundle_name: str,
-        bundle: Bundle,
-        apt_runner: AptCommandRunner
+        bundles: Dict[str, Bundle],
+        first_seq: int
     ):
         """Initialize the metapackage context.
 
         Args:
-            bundle_name: Name of the bundle
-            bundle: Bundle definition
-            apt_runner: APT command runner for executing equivs-build
+            bundles: Bundle definitions by bundle name
+            first_seq: Build sequence number of the first bundle; the others
+                take the following numbers. Sequence numbers must grow with
+                every build so apt always sees a new metapackage as an upgrade
         """
-        self.bundle_name = bundle_name
-        self.bundle = bundle
-        self.apt_runner = apt_runner
-        self.temp_dir = None
-        self.deb_file = None
+        self.bundles = bundles
+        # "+" sorts after the "~" of the timestamped versions of earlier
+        # releases, so existing metapackages are upgraded too
+        self.versions = {
+            name: f"1.0+{seq:010d}"
+            for seq, name in enumerate(bundles, first_seq)
+        }
+        self._temp: Optional[tempfile.TemporaryDirectory] = None
+        self.temp_dir: Optional[Path] = None
+        self.deb_files: List[Path] = []
 
     @staticmethod
-    def get_metapackage_name(bundle_name: str) -> str:
-        """Get metapackage name for a bundle.
+    def get_version_seq(version: str) -> int:
+        """Get the build sequence number of a metapackage version.
 
         Args:
-            bundle_name: Name of the bundle
+            version: Version of a metapackage built by bdapt
 
         Returns:
-            Metapackage name with bdapt prefix
+            The sequence number, or 0 for versions of earlier releases
         """
-        return f"bdapt-{bundle_name}"
+        _, sep, seq = version.partition("+")
+        return int(seq) if sep and seq.isdigit() else 0
 
     @staticmethod
-    def check_prerequisites(apt_runner: AptCommandRunner) -> None:
-        """Check that required tools are available.
+    def get_metapackage_name(bundle_name: str) -> str:
+        """Get metapackage name for a bundle.
 
         Args:
-            apt_runner: APT command runner to check for command existence
-
-        Raises:
-            CommandError: If required tools are missing
-        """
-        if not apt_runner.check_command_exists("equivs-build"):
-            raise CommandError(
-                "equivs-build not found. Please install equivs package: sudo apt install equivs"
-            )
-
-    def _generate_control_file_content(self) -> str:
-        """Generate equivs control file content.
+            bundle_name: Name of the bundle
 
         Returns:
-            Control file content as string
+            Metapackage name with bdapt prefix
         """
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        metapackage_name = self.get_metapackage_name(self.bundle_name)
+        return f"bdapt-{bundle_name}"
 
+    def _build_one(self, bundle_name: str) -> Path:
+        """Write the metapackage of one bundle into the temp directory."""
+        assert self.temp_dir is not None
+        bundle = self.bundles[bundle_name]
+        metapackage_name = self.get_metapackage_name(bundle_name)
+        version = self.versions[bundle_name]
         description = (
-            self.bundle.description or
-            f"Generated metapackage for bdapt bundle '{self.bundle_name}'"
+            bundle.description or
+            f"Generated metapackage for bdapt bundle '{bundle_name}'"
         )
 
-        control_content = dedent(f"""
-        Package: {metapackage_name}
-        Version: 1.0~{timestamp}
-        Maintainer: bdapt <bdapt@localhost>
-        Architecture: all
-        Description: {description}
-        """).strip() + "\n"
-
-        if self.bundle.packages:
-            depends = self.bundle.get_depends_string()
-            control_content += f"Depends: {depends}\n"
-
-        return control_content
+        deb_file = self.temp_dir / f"{metapackage_name}_{version}_all.deb"
+        deb_file.write_bytes(build_metapackage_deb(
+            metapackage_name, version, description, bundle.depends_string))
+        return deb_file
 
     def _build(self) -> None:
-        """Build the metapackage.
+        """Build the metapackages.
 
-        Creates temp directory, generates control file, and builds .deb package.
+        Creates temp directory, then builds the .deb packages in memory and
+        writes each with a single call, one bundle per worker thread.
 
         Raises:
             CommandError: If metapackage creation fails
         """
-        self.check_prerequisites(self.apt_runner)
-
-        self.temp_dir = Path(tempfile.mkdtemp())
+        self._temp = tempfile.TemporaryDirectory(prefix="bdapt-")
+        self.temp_dir = Path(self._temp.name)
         try:
-            control_file = self.temp_dir / "control"
-
-            # Generate and write control file
-            control_content = self._generate_control_file_content()
-            control_file.write_text(control_content)
-
-            # Build metapackage
-            self.apt_runner.run_command(
-                ["equivs-build", str(control_file)],
-                cwd=self.temp_dir,
-                capture_output=True,
-                text=True,
-            )
-
-            # Find generated .deb file
-            deb_files = list(self.temp_dir.glob("*.deb"))
-            if not deb_files:
-                raise CommandError("equivs-build did not generate a .deb file")
-
-            self.deb_file = deb_files[0]
-
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                self.deb_files = list(
+                    executor.map(self._build_one, self.bundles))
         except Exception as e:
-            # Clean up temp directory on failure
-            if self.temp_dir:
-                shutil.rmtree(self.temp_dir, ignore_errors=True)
-            if isinstance(e, CommandError):
-                raise
             raise CommandError(f"Failed to build metapackage: {e}")
 
-    def __enter__(self) -> Path:
-        """Enter the context and return the .deb file path.
+    def __enter__(self) -> List[Path]:
+        """Enter the context and return the .deb file paths.
 
         Returns:
-            Path to the generated .deb file
+            Paths to the generated .deb files, in bundle order
 
         Raises:
             CommandError: If metapackage creation fails
         """
-        with console.status(f"Building metapackage for [bold]{self.bundle_name}[/bold]..."):
-            self._build()
-        if self.deb_file is None:
-            raise CommandError("Metapackage build did not produce a .deb file")
-        return self.deb_file
+        names = ", ".join(self.bundles)
+        try:
+            with console.status(f"Building metapackage for [bold]{names}[/bold]..."):
+                self._build()
+            if len(self.deb_files) != len(self.bundles):
+                raise CommandError(
+                    "Metapackage build did not produce a .deb file")
+        except BaseException:
+            # __exit__ does not run when __enter__ fails
+            self._cleanup()
+            raise
+        return self.deb_files
+
+    def _cleanup(self) -> None:
+        """Delete the temporary directory, if it was created."""
+        if self._temp is not None:
+            self._temp.cleanup()
+            self._temp = None
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         """Exit the context and clean up the temporary directory.
@@ -153,5 +134,4 @@ class MetapackageContext:
             exc_val: Exception value if an exception occurred
             exc_tb: Exception traceback if an exception occurred
         """
-        if self.temp_dir:
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self._cleanup()
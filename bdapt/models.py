@@ -1,11 +1,17 @@
 """Data models for bdapt."""
 
-from typing import Dict, Optional
-from pydantic import BaseModel, Field
+from functools import cached_property
+from typing import Dict, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class PackageSpec(BaseModel):
-    """Specification for a package within a bundle."""
+    """Specification for a package within a bundle.
+
+    Specs are immutable, so one instance can be shared by many packages.
+    """
+
+    model_config = ConfigDict(frozen=True)
 
     version: Optional[str] = None
 
@@ -22,8 +28,18 @@ class Bundle(BaseModel):
     description: str = ""
     packages: Dict[str, PackageSpec] = Field(default_factory=dict)
 
-    def get_depends_string(self) -> str:
-        """Get comma-separated APT depends string."""
+    @cached_property
+    def sorted_packages(self) -> Tuple[str, ...]:
+        """Package names in sorted order, computed once per instance."""
+        return tuple(sorted(self.packages))
+
+    @cached_property
+    def depends_string(self) -> str:
+        """Comma-separated APT depends string.
+
+        Computed once per instance, so a bundle whose packages change is
+        replaced by a new Bundle rather than mutated.
+        """
         return ", ".join(
             spec.to_apt_string(name) for name, spec in self.packages.items()
         )
@@ -33,3 +49,5 @@ class BundleStorage(BaseModel):
     """Root storage model for all bundles."""
 
     bundles: Dict[str, Bundle] = Field(default_factory=dict)
+    # Bumped for every metapackage build, to version the metapackages
+    version_seq: int = 0
@@ -1,6 +1,7 @@
 import fcntl
 import os
 import sys
+import time
 
 import typer
 
@@ -10,7 +11,10 @@ from .storage import DATA_DIR
 LOCKFILE = "bdapt.lock"
 LOCKFILE_PATH = DATA_DIR / LOCKFILE
 
-_lock_file = None
+# How long to wait for another instance to release the lock, in seconds
+LOCK_TIMEOUT = 1.0
+
+_lock_fd = None
 
 
 def _elevate():
@@ -18,7 +22,8 @@ def _elevate():
     if os.getuid() == 0:
         return
     try:
-        args = [sys.executable] + sys.argv
+        # -B: root must not leave root-owned .pyc files in a user's install
+        args = [sys.executable, "-B"] + sys.argv
         os.execlp("sudo", "sudo", *args)
     except Exception as e:
         console.print(
@@ -26,14 +31,43 @@ def _elevate():
         raise typer.Exit(1)
 
 
+def _flock_with_retry(fd: int) -> None:
+    """Take an exclusive lock, retrying with backoff for LOCK_TIMEOUT.
+
+    An instance that is just finishing gets a moment to let go, while a
+    long-running one is reported instead of waited on.
+    """
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    delay = 0.01
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            time.sleep(min(delay, remaining))
+            delay *= 2
+
+
 def _acquire_lock():
     """Acquire an exclusive lock on the specified lockfile."""
-    global _lock_file
+    global _lock_fd
+    if _lock_fd is not None:
+        return
     try:
         os.makedirs(DATA_DIR, exist_ok=True)
-        _lock_file = open(LOCKFILE_PATH, "w")
-        fcntl.flock(_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-    except (IOError, OSError):
+        # Opened without truncating: the lock file has no content to reset
+        fd = os.open(LOCKFILE_PATH, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            _flock_with_retry(fd)
+        except OSError:
+            os.close(fd)
+            raise
+        # Kept for the life of the process, which holds the lock
+        _lock_fd = fd
+    except OSError:
         console.print(
             f"[red]Unable to acquire lock: {LOCKFILE_PATH}. Is another instance already running?[/red]")
         raise typer.Exit(1)
@@ -43,3 +77,13 @@ def aquire_root_and_lock():
     """Acquire root privileges and a lock on the lockfile."""
     _elevate()
     _acquire_lock()
+
+
+def keep_lock_across_exec():
+    """Let the lock outlive an exec of this process.
+
+    Used when bdapt hands its final step over to apt via exec, so no other
+    instance can start until apt is done.
+    """
+    if _lock_fd is not None:
+        os.set_inheritable(_lock_fd, True)
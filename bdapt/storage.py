@@ -1,11 +1,18 @@
 """Storage layer for bdapt."""
 
+import hashlib
 import json
 import os
+import tempfile
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from .exceptions import StorageError
-from .models import BundleStorage
+
+if TYPE_CHECKING:
+    # pydantic is only needed once bundles are validated, which the raw
+    # loaders used by shell completion never do
+    from .models import Bundle, BundleStorage
 
 DATA_DIR = Path("/etc/bdapt")
 
@@ -21,6 +28,11 @@ class BundleStore:
         """
         self.data_dir = DATA_DIR
         self.bundles_file = DATA_DIR / "bundles.json"
+        # Parsed file contents, keyed by file_key()
+        self._raw_cache: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+        # Digest of the file's contents as last read or written, keyed by
+        # file_key() at that point
+        self._known: Optional[Tuple[Tuple[int, int], bytes]] = None
 
     def _ensure_directory(self) -> None:
         """Ensure the data directory exists."""
@@ -29,32 +41,155 @@ class BundleStore:
         except OSError as e:
             raise StorageError(f"Failed to create data directory: {e}")
 
-    def load(self) -> BundleStorage:
+    def file_key(self) -> Optional[Tuple[int, int]]:
+        """Identify the current version of the bundles file.
+
+        The size is part of the key since a rewrite within the mtime
+        granularity of the filesystem leaves the mtime unchanged.
+
+        Returns:
+            The file's (mtime in ns, size), or None if it does not exist
+        """
+        try:
+            st = self.bundles_file.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _digest(content: bytes) -> bytes:
+        """Fingerprint file contents, to tell whether a save changes them."""
+        return hashlib.blake2b(content, digest_size=16).digest()
+
+    def _load_raw(self) -> Dict[str, Any]:
+        """Read the parsed JSON of the bundles file, without validation.
+
+        The file is parsed again only when its file_key() changes. The
+        result is shared, so callers must not modify it.
+        """
+        key = self.file_key()
+        if key is None:
+            return {}
+
+        if self._raw_cache is not None and self._raw_cache[0] == key:
+            return self._raw_cache[1]
+
+        # One read of the whole file; json decodes the UTF-8 itself
+        with open(self.bundles_file, "rb") as f:
+            content = f.read()
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise StorageError(f"Failed to load bundles: {e}")
+        self._raw_cache = (key, data)
+        self._known = (key, self._digest(content))
+        return data
+
+    def load(self) -> "BundleStorage":
         """Load bundle storage from disk."""
-        if not self.bundles_file.exists():
-            return BundleStorage()
+        from .models import BundleStorage
 
+        data = self._load_raw()
+        if data == {}:
+            # Nothing on disk yet; the defaults need no validation. A fresh
+            # instance each time, as callers update the storage they load
+            return BundleStorage()
         try:
-            with open(self.bundles_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
             return BundleStorage.model_validate(data)
-        except (json.JSONDecodeError, ValueError) as e:
+        except ValueError as e:
+            raise StorageError(f"Failed to load bundles: {e}")
+
+    def load_names(self) -> List[str]:
+        """Load the names of all bundles, without validating any bundle."""
+        try:
+            return list(self._load_raw().get("bundles", {}))
+        except AttributeError as e:
+            raise StorageError(f"Failed to load bundles: {e}")
+
+    def load_packages(self, name: str) -> List[str]:
+        """Load the package names of one bundle, without validation.
+
+        Args:
+            name: Name of the bundle
+
+        Returns:
+            Package names of the bundle; empty if it does not exist
+        """
+        try:
+            bundle = self._load_raw().get("bundles", {}).get(name) or {}
+            return list(bundle.get("packages", {}))
+        except AttributeError as e:
+            raise StorageError(f"Failed to load bundles: {e}")
+
+    def load_summary(self) -> Dict[str, Tuple[str, int]]:
+        """Load the description and package count of every bundle.
+
+        Meant for listings: no package specs are validated or built.
+
+        Returns:
+            Mapping of bundle name to (description, package count)
+        """
+        try:
+            return {
+                name: (bundle.get("description", ""),
+                       len(bundle.get("packages", {})))
+                for name, bundle in self._load_raw().get("bundles", {}).items()
+            }
+        except (AttributeError, TypeError) as e:
             raise StorageError(f"Failed to load bundles: {e}")
 
-    def save(self, storage: BundleStorage) -> None:
+    def load_bundle(self, name: str) -> Optional["Bundle"]:
+        """Load a single bundle, validating only that bundle.
+
+        Args:
+            name: Name of the bundle
+
+        Returns:
+            The bundle, or None if it does not exist
+        """
+        from .models import Bundle
+
+        try:
+            data = self._load_raw().get("bundles", {}).get(name)
+            if data is None:
+                return None
+            return Bundle.model_validate(data)
+        except (AttributeError, ValueError) as e:
+            raise StorageError(f"Failed to load bundles: {e}")
+
+    def save(self, storage: "BundleStorage") -> None:
         """Save bundle storage to disk."""
         assert os.getuid() == 0, "Must be run as root"
+        content = json.dumps(
+            storage.model_dump(), indent=2, sort_keys=True).encode("utf-8")
+        digest = self._digest(content)
+
+        # Nothing to write if the file still holds exactly this content
+        if (self._known is not None and self._known[1] == digest
+                and self._known[0] == self.file_key()):
+            return
+
         self._ensure_directory()
 
+        # Write a uniquely named file next to the store and rename it over
+        # the old one: same filesystem, so the rename is atomic and readers
+        # never see a half-written store
+        tmp_file: Optional[Path] = None
         try:
-            with open(self.bundles_file, "w", encoding="utf-8") as f:
-                json.dump(
-                    storage.model_dump(),
-                    f,
-                    indent=2,
-                    sort_keys=True,
-                )
-            # Set readable permissions for all users
-            self.bundles_file.chmod(0o644)
+            fd, tmp_name = tempfile.mkstemp(
+                dir=self.data_dir, prefix=".bundles.", suffix=".json.tmp")
+            tmp_file = Path(tmp_name)
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                # Make the data durable before the rename publishes it
+                f.flush()
+                os.fsync(f.fileno())
+                # Set readable permissions for all users; mkstemp uses 0600
+                os.fchmod(f.fileno(), 0o644)
+            os.replace(tmp_file, self.bundles_file)
+            self._raw_cache = None
+            self._known = (self.file_key(), digest)
         except OSError as e:
+            if tmp_file is not None:
+                tmp_file.unlink(missing_ok=True)
             raise StorageError(f"Failed to save bundles: {e}")
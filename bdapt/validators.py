@@ -1,11 +1,23 @@
 """Input validation utilities for bdapt."""
 
 import re
+import string
 from typing import List
 
 import typer
 from .exceptions import ValidationError
 
+# Used with fullmatch: "$" would also accept a trailing newline
+_BUNDLE_NAME_RE = re.compile(r"[a-z0-9](?:[a-z0-9.-]*[a-z0-9])?")
+# Basic validation - debian package names are quite flexible
+_PACKAGE_NAME_FIRST = frozenset(string.ascii_letters + string.digits)
+_PACKAGE_NAME_CHARS = _PACKAGE_NAME_FIRST | frozenset("+.-")
+
+
+def _is_valid_package_name(name: str) -> bool:
+    """Check a non-empty package name with set lookups, no regex engine."""
+    return name[0] in _PACKAGE_NAME_FIRST and _PACKAGE_NAME_CHARS.issuperset(name)
+
 
 def validate_bundle_name(name: str) -> None:
     """Validate bundle name for use in metapackage names.
@@ -19,16 +31,9 @@ def validate_bundle_name(name: str) -> None:
     if not name:
         raise ValidationError("Bundle name cannot be empty")
 
-    # Single character names must be alphanumeric
-    if len(name) == 1:
-        if not re.match(r"^[a-z0-9]$", name):
-            raise ValidationError(
-                f"Invalid bundle name '{name}'. Single character names must be lowercase alphanumeric."
-            )
-        return
-
-    # Multi-character names must follow debian package naming rules
-    if not re.match(r"^[a-z0-9][a-z0-9.-]*[a-z0-9]$", name):
+    # Names must follow debian package naming rules; a single character
+    # must be alphanumeric
+    if not _BUNDLE_NAME_RE.fullmatch(name):
         raise ValidationError(
             f"Invalid bundle name '{name}'. Must contain only lowercase letters, numbers, dots, and hyphens, and start/end with alphanumeric characters."
         )
@@ -59,14 +64,16 @@ def validate_package_names(packages: List[str]) -> None:
     Exits:
         With code 1 if any package name is invalid
     """
-    for pkg in packages:
-        if not pkg or not pkg.strip():
-            raise ValidationError(
-                "Package names cannot be empty or whitespace-only"
-            )
-
-        # Basic validation - debian package names are quite flexible
-        if not re.match(r"^[a-zA-Z0-9][a-zA-Z0-9+.-]*$", pkg.strip()):
-            raise ValidationError(
-                f"Invalid package name '{pkg}'. Package names must start with alphanumeric characters and contain only letters, numbers, plus signs, dots, and hyphens."
-            )
+    names = [pkg.strip() for pkg in packages]
+    if not all(names):
+        raise ValidationError(
+            "Package names cannot be empty or whitespace-only"
+        )
+
+    # Scan in one pass; the message is only built for an offender
+    pkg = next((pkg for pkg, name in zip(packages, names)
+                if not _is_valid_package_name(name)), None)
+    if pkg is not None:
+        raise ValidationError(
+            f"Invalid package name '{pkg}'. Package names must start with alphanumeric characters and contain only letters, numbers, plus signs, dots, and hyphens."
+        )